@@ -1,5 +1,5 @@
 from flask import Flask
-from models import db
+from models import db, ensure_fuel_quote_search
 from views import add_endpoints
 
 app = Flask(__name__)
@@ -10,5 +10,6 @@ if __name__ == '__main__':
     db.init_app(app)
     with app.app_context():
         db.create_all()
+        ensure_fuel_quote_search(db.engine)
         add_endpoints(app)
     app.run(debug=True)
\ No newline at end of file
@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event, text
 
 db = SQLAlchemy()
 
@@ -26,6 +27,52 @@ class FuelQuote(db.Model):
     total_amount_due = db.Column(db.Float, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user_credentials.id'), nullable=False)
 
+    # Lets history search walk one user's quotes newest first without sorting them
+    __table_args__ = (db.Index('ix_fuel_quote_user_id_delivery_date', 'user_id', 'delivery_date', 'id'),)
+
+# Full-text index over delivery addresses, used by the quote history search.
+# It is an external content FTS5 table, so it only stores the index; the
+# triggers below keep it in sync with fuel_quote on every insert/update/delete.
+# user_id is indexed too so a search is narrowed to one user inside FTS5
+# instead of pulling every address match and filtering it afterwards.
+FUEL_QUOTE_FTS_TABLE = """CREATE VIRTUAL TABLE fuel_quote_fts USING fts5(
+    delivery_address, user_id, content='fuel_quote', content_rowid='id', prefix='2 3'
+)"""
+
+FUEL_QUOTE_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS fuel_quote_fts_insert AFTER INSERT ON fuel_quote BEGIN
+        INSERT INTO fuel_quote_fts(rowid, delivery_address, user_id) VALUES (new.id, new.delivery_address, new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS fuel_quote_fts_delete AFTER DELETE ON fuel_quote BEGIN
+        INSERT INTO fuel_quote_fts(fuel_quote_fts, rowid, delivery_address, user_id) VALUES ('delete', old.id, old.delivery_address, old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS fuel_quote_fts_update AFTER UPDATE OF delivery_address, user_id ON fuel_quote BEGIN
+        INSERT INTO fuel_quote_fts(fuel_quote_fts, rowid, delivery_address, user_id) VALUES ('delete', old.id, old.delivery_address, old.user_id);
+        INSERT INTO fuel_quote_fts(rowid, delivery_address, user_id) VALUES (new.id, new.delivery_address, new.user_id);
+    END""",
+]
+
+# Call after db.create_all(). create_all skips tables that already exist, so this
+# adds the search indexes to existing databases and indexes the quotes already in them.
+def ensure_fuel_quote_search(engine):
+    if engine.dialect.name != 'sqlite':
+        return
+
+    with engine.begin() as connection:
+        for index in FuelQuote.__table__.indexes:
+            index.create(bind=connection, checkfirst=True)
+
+        fts_exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fuel_quote_fts'")
+        ).first()
+        if not fts_exists:
+            connection.execute(text(FUEL_QUOTE_FTS_TABLE))
+            connection.execute(text("INSERT INTO fuel_quote_fts(fuel_quote_fts) VALUES ('rebuild')"))
+
+        for trigger in FUEL_QUOTE_FTS_TRIGGERS:
+            connection.execute(text(trigger))
+
+event.listen(FuelQuote.__table__, 'before_drop', DDL("DROP TABLE IF EXISTS fuel_quote_fts").execute_if(dialect='sqlite'))
 
 
 
@@ -1,6 +1,7 @@
 from app import app
-from models import db, UserCredentials, FuelQuote, ClientInformation
+from models import db, UserCredentials, FuelQuote, ClientInformation, ensure_fuel_quote_search
 from views import add_endpoints, get_password_hash
+from sqlalchemy import text
 from datetime import datetime, date
 import pytest
 
@@ -21,6 +22,7 @@ def client():
     # Set up the database
     with app.app_context():
         db.create_all()
+        ensure_fuel_quote_search(db.engine)
 
     yield client
 
@@ -335,3 +337,112 @@ def test_fuel_post_method_with_invalid_data(client):
     response = client.post('/fuel_quote_form', data=form_data, follow_redirects=True)
     assert b'Invalid input for price or total amount.' in response.data
     assert b'Fuel Quote Form' in response.data
+
+def add_search_quotes():
+    with app.app_context():
+        user = UserCredentials(username='testuser', password='')
+        other_user = UserCredentials(username='otheruser', password='')
+        db.session.add_all([user, other_user])
+        db.session.commit()
+        quotes = [
+            (user.id, '123 Main St, Houston, TX 77001', date(2024, 1, 5)),
+            (user.id, '456 Oak Ave, Houston, TX 77002', date(2024, 2, 5)),
+            (user.id, '789 Pine Rd, Austin, TX 73301', date(2024, 3, 5)),
+            (other_user.id, '10 Main St, Dallas, TX 75001', date(2024, 4, 5)),
+        ]
+        for user_id, address, delivery_date in quotes:
+            db.session.add(FuelQuote(user_id=user_id, gallons_requested=10.0, delivery_address=address,
+                                     delivery_date=delivery_date, suggested_price_per_gallon=1.5,
+                                     total_amount_due=15.0))
+        db.session.commit()
+        return user.id
+
+def test_history_search_prefix_match(client):
+    add_search_quotes()
+    with client.session_transaction() as session:
+        session['username'] = 'testuser'
+    response = client.get('/history/search?q=hous')
+    addresses = [quote['deliveryAddress'] for quote in response.get_json()['quotes']]
+    # Newest delivery first
+    assert addresses == ['456 Oak Ave, Houston, TX 77002', '123 Main St, Houston, TX 77001']
+
+def test_history_search_only_returns_own_quotes(client):
+    add_search_quotes()
+    with client.session_transaction() as session:
+        session['username'] = 'testuser'
+    response = client.get('/history/search?q=main')
+    assert [quote['deliveryAddress'] for quote in response.get_json()['quotes']] == ['123 Main St, Houston, TX 77001']
+
+def test_history_search_date_range(client):
+    add_search_quotes()
+    with client.session_transaction() as session:
+        session['username'] = 'testuser'
+    response = client.get('/history/search?q=tx&start_date=2024-02-01&end_date=2024-03-31')
+    assert [quote['deliveryDate'] for quote in response.get_json()['quotes']] == ['2024-03-05', '2024-02-05']
+
+def test_history_search_pagination(client):
+    add_search_quotes()
+    with client.session_transaction() as session:
+        session['username'] = 'testuser'
+    first_page = client.get('/history/search?q=tx&per_page=2').get_json()
+    assert [quote['deliveryDate'] for quote in first_page['quotes']] == ['2024-03-05', '2024-02-05']
+    assert first_page['next_cursor']
+
+    second_page = client.get('/history/search', query_string={
+        'q': 'tx', 'per_page': 2, 'cursor': first_page['next_cursor']
+    }).get_json()
+    assert [quote['deliveryDate'] for quote in second_page['quotes']] == ['2024-01-05']
+    assert second_page['next_cursor'] is None
+
+def test_history_search_tracks_updates_and_deletes(client):
+    add_search_quotes()
+    with client.session_transaction() as session:
+        session['username'] = 'testuser'
+    with app.app_context():
+        quote = FuelQuote.query.filter_by(delivery_address='789 Pine Rd, Austin, TX 73301').first()
+        quote.delivery_address = '789 Pine Rd, Houston, TX 77003'
+        db.session.delete(FuelQuote.query.filter_by(delivery_address='123 Main St, Houston, TX 77001').first())
+        db.session.commit()
+    assert client.get('/history/search?q=austin').get_json()['quotes'] == []
+    response = client.get('/history/search?q=houston')
+    assert [quote['deliveryAddress'] for quote in response.get_json()['quotes']] == \
+        ['789 Pine Rd, Houston, TX 77003', '456 Oak Ave, Houston, TX 77002']
+
+def test_history_search_indexes_existing_quotes(client):
+    # Simulate a database created before the search index existed
+    with app.app_context():
+        for trigger in ['fuel_quote_fts_insert', 'fuel_quote_fts_delete', 'fuel_quote_fts_update']:
+            db.session.execute(text(f"DROP TRIGGER {trigger}"))
+        db.session.execute(text("DROP TABLE fuel_quote_fts"))
+        db.session.execute(text("DROP INDEX ix_fuel_quote_user_id_delivery_date"))
+        db.session.commit()
+    add_search_quotes()
+    with app.app_context():
+        ensure_fuel_quote_search(db.engine)
+        # Safe to run again on every start
+        ensure_fuel_quote_search(db.engine)
+    with client.session_transaction() as session:
+        session['username'] = 'testuser'
+    response = client.get('/history/search?q=hous')
+    assert [quote['deliveryDate'] for quote in response.get_json()['quotes']] == ['2024-02-05', '2024-01-05']
+
+def test_history_search_invalid_input(client):
+    setup_user_and_client_info(client)
+    assert client.get('/history/search?q=').status_code == 400
+    assert client.get('/history/search?q=1 main').status_code == 400
+    assert client.get('/history/search?q=main&start_date=bad').status_code == 400
+    assert client.get('/history/search?q=main&per_page=abc').status_code == 400
+    assert client.get('/history/search?q=main&cursor=2024-01-01:abc').status_code == 400
+    assert client.get('/history/search?q=main&cursor=2024-01-01:99999999999999999999').status_code == 400
+
+def test_history_search_without_login(client):
+    response = client.get('/history/search?q=main')
+    assert response.status_code == 302
+    assert response.location == '/login'
+
+def test_history_search_unknown_user(client):
+    with client.session_transaction() as session:
+        session['username'] = 'missinguser'
+    response = client.get('/history/search?q=main')
+    assert response.status_code == 302
+    assert response.location == '/login'
@@ -1,8 +1,10 @@
-from flask import session, redirect, render_template, request, flash, url_for
+from flask import session, redirect, render_template, request, flash, url_for, jsonify
 from flask.views import MethodView
 from models import db, UserCredentials, ClientInformation, FuelQuote
+from sqlalchemy import column, text, tuple_
 from datetime import datetime
 import decimal
+import re
 import bcrypt
 
 # Source: https://stackoverflow.com/questions/77897298/storing-and-retrieving-hashed-password-in-postgres
@@ -18,6 +20,21 @@ def verify_password(plain_password, hashed_password):
     hashed_password = hashed_password.encode('utf-8')
     return bcrypt.checkpw(password_byte_enc, hashed_password)
 
+def format_quote(quote):
+    return {
+        'gallonsRequested': quote.gallons_requested,
+        'deliveryAddress': quote.delivery_address,
+        'deliveryDate': quote.delivery_date.strftime('%Y-%m-%d'),  # Format date for display
+        'pricePerGallon': "{:.2f}".format(quote.suggested_price_per_gallon),
+        'total': "{:.2f}".format(quote.total_amount_due)
+    }
+
+# Turns words like ["123", "main", "hou"] into an FTS5 query where every word is a
+# prefix match against the address, limited to the given user's quotes
+def build_match_query(words, user_id):
+    address_query = " ".join('"{}"*'.format(word) for word in words)
+    return 'delivery_address : ({}) AND user_id : "{}"'.format(address_query, user_id)
+
 class Login(MethodView):
     init_every_request = False
 
@@ -244,13 +261,7 @@ class History(MethodView):
                 fuel_quotes = FuelQuote.query.filter_by(user_id=user_credentials.id).order_by(FuelQuote.delivery_date).all()
 
                 # Prepare the data for rendering
-                quotes_data = [{
-                    'gallonsRequested': quote.gallons_requested,
-                    'deliveryAddress': quote.delivery_address,
-                    'deliveryDate': quote.delivery_date.strftime('%Y-%m-%d'),  # Format date for display
-                    'pricePerGallon': "{:.2f}".format(quote.suggested_price_per_gallon),
-                    'total': "{:.2f}".format(quote.total_amount_due)
-                } for quote in fuel_quotes]
+                quotes_data = [format_quote(quote) for quote in fuel_quotes]
 
                 return render_template('FuelHistory.html', quotes_data=quotes_data)
             else:
@@ -261,6 +272,71 @@ class History(MethodView):
             return redirect('/login')
 
 
+class HistorySearch(MethodView):
+    init_every_request = False
+    max_per_page = 100
+    # Shorter prefixes match nearly every address and aren't covered by the FTS5 prefix index
+    min_word_length = 2
+    max_sqlite_integer = 2 ** 63 - 1
+
+    def get(self):
+        if 'username' not in session:
+            flash('Please log in to search fuel history.', 'error')
+            return redirect('/login')
+
+        user_credentials = UserCredentials.query.filter_by(username=session['username']).first()
+        if not user_credentials:
+            flash('User credentials not found.', 'error')
+            return redirect('/login')
+
+        words = re.findall(r'\w+', request.args.get('q', ''))
+        if not words:
+            return jsonify(error="Search text is required"), 400
+        if any(len(word) < self.min_word_length for word in words):
+            return jsonify(error=f"Search words must be at least {self.min_word_length} characters"), 400
+
+        try:
+            per_page = min(max(int(request.args.get('per_page', 20)), 1), self.max_per_page)
+            start_date = request.args.get('start_date')
+            end_date = request.args.get('end_date')
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+
+            # The cursor is the delivery date and id of the last quote on the previous page
+            cursor = request.args.get('cursor')
+            if cursor:
+                cursor_date, _, cursor_id = cursor.partition(':')
+                cursor_date = datetime.strptime(cursor_date, '%Y-%m-%d').date()
+                cursor_id = int(cursor_id)
+                if not 0 < cursor_id <= self.max_sqlite_integer:
+                    raise ValueError(cursor_id)
+        except ValueError:
+            return jsonify(error="Invalid page size, date or cursor"), 400
+
+        # Look up matching ids in the full-text index instead of scanning delivery_address
+        matching_ids = text("SELECT rowid FROM fuel_quote_fts WHERE fuel_quote_fts MATCH :match").columns(column('rowid'))
+        query = FuelQuote.query.filter(FuelQuote.user_id == user_credentials.id, FuelQuote.id.in_(matching_ids)) \
+            .params(match=build_match_query(words, user_credentials.id))
+        if start_date:
+            query = query.filter(FuelQuote.delivery_date >= start_date)
+        if end_date:
+            query = query.filter(FuelQuote.delivery_date <= end_date)
+        if cursor:
+            query = query.filter(tuple_(FuelQuote.delivery_date, FuelQuote.id) < (cursor_date, cursor_id))
+
+        # Fetch one extra row to know if there is a next page without counting every match
+        fuel_quotes = query.order_by(FuelQuote.delivery_date.desc(), FuelQuote.id.desc()).limit(per_page + 1).all()
+
+        next_cursor = None
+        if len(fuel_quotes) > per_page:
+            last_quote = fuel_quotes[per_page - 1]
+            next_cursor = "{}:{}".format(last_quote.delivery_date.strftime('%Y-%m-%d'), last_quote.id)
+
+        return jsonify(
+            quotes=[format_quote(quote) for quote in fuel_quotes[:per_page]],
+            per_page=per_page,
+            next_cursor=next_cursor
+        )
 
 def add_endpoints(app):
     app.add_url_rule("/register", view_func=Register.as_view("Register"))
@@ -269,4 +345,5 @@ def add_endpoints(app):
     app.add_url_rule("/login", view_func=Login.as_view("Login"))
     app.add_url_rule("/logout", view_func=Logout.as_view("Logout"))
     app.add_url_rule("/history", view_func=History.as_view("History"))
+    app.add_url_rule("/history/search", view_func=HistorySearch.as_view("HistorySearch"))
     app.add_url_rule("/fuel_quote_form", view_func=FuelQuoteForm.as_view("FuelQuoteForm"))
\ No newline at end of file